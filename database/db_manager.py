@@ -1,3 +1,4 @@
+import json
 import sqlite3
 import os
 import threading
@@ -34,6 +35,10 @@ class Database:
         # Use a reentrant lock to allow the same thread to acquire the lock multiple times
         self.lock = threading.RLock()
         self._init_db()
+        # Long-lived read-only connections, one per thread (see get_read_conn). Reads
+        # don't take self.lock: in WAL mode they run concurrently with each other and with a writer.
+        self._local = threading.local()
+        self._read_conns: List[sqlite3.Connection] = []
         # print(f"Database initialized at: {self.db_path}") # Removed debug print
 
     def _init_db(self):
@@ -41,6 +46,9 @@ class Database:
         try:
             with self.lock:
                 with sqlite3.connect(self.db_path) as conn:
+                    # WAL lets readers proceed while a writer is active; the mode is stored in the file
+                    conn.execute("PRAGMA journal_mode = WAL")
+                    conn.execute("PRAGMA synchronous = NORMAL") # Safe with WAL, fewer fsyncs
                     cursor = conn.cursor()
                     cursor.executescript("""
                     CREATE TABLE IF NOT EXISTS tags (
@@ -48,13 +56,18 @@ class Database:
                         name TEXT UNIQUE NOT NULL, -- Added NOT NULL constraint
                         category TEXT
                     );
+                    CREATE TABLE IF NOT EXISTS directories (
+                        id INTEGER PRIMARY KEY,
+                        path TEXT UNIQUE NOT NULL -- Normalized, with trailing '/'
+                    );
                     CREATE TABLE IF NOT EXISTS images (
                         id TEXT PRIMARY KEY,
                         path TEXT UNIQUE NOT NULL, -- Added NOT NULL constraint
                         rating TEXT,
                         file_size INTEGER,
                         modification_time REAL, -- Use REAL for potentially more precision
-                        resolution TEXT -- e.g., "1920x1080"
+                        resolution TEXT, -- e.g., "1920x1080"
+                        dir_id INTEGER REFERENCES directories(id) -- Directory directly containing the image
                     );
                     CREATE TABLE IF NOT EXISTS image_tags (
                         image_id TEXT NOT NULL, -- Added NOT NULL constraint
@@ -65,12 +78,16 @@ class Database:
                         PRIMARY KEY (image_id, tag_id)
                     );
                     """)
+                    self._migrate_image_directories(cursor)
+                    self._migrate_lowercase_tags(cursor)
                     # Create indexes for performance
                     cursor.execute("CREATE INDEX IF NOT EXISTS idx_tags_name ON tags(name)")
-                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_path ON images(path)")
+                    # images.path is UNIQUE, so its autoindex already serves path lookups
+                    cursor.execute("DROP INDEX IF EXISTS idx_images_path")
                     cursor.execute("CREATE INDEX IF NOT EXISTS idx_image_tags_image_id ON image_tags(image_id)")
                     cursor.execute("CREATE INDEX IF NOT EXISTS idx_image_tags_tag_id ON image_tags(tag_id)")
                     cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_modification_time ON images(modification_time)")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_dir_id ON images(dir_id)")
                     # Consider adding indexes for rating, file_size, resolution if frequently searched/sorted
                     conn.commit()
             # print("Database schema initialized/verified.") # Removed debug print
@@ -78,15 +95,109 @@ class Database:
             print(f"Database initialization error: {e}")
             raise
 
+    def _migrate_image_directories(self, cursor: sqlite3.Cursor):
+        """
+        Adds images.dir_id to databases created before the directories table existed,
+        and backfills it (and the directories table) for any image that lacks it.
+        """
+        cursor.execute("PRAGMA table_info(images)")
+        if "dir_id" not in {row[1] for row in cursor.fetchall()}:
+            print("Migrating database: adding directory IDs to images...")
+            cursor.execute("ALTER TABLE images ADD COLUMN dir_id INTEGER REFERENCES directories(id)")
+        # rtrim(path, replace(path, '/', '')) strips the file name, leaving the directory with its trailing '/'
+        cursor.execute("""
+            INSERT OR IGNORE INTO directories (path)
+            SELECT DISTINCT rtrim(path, replace(path, '/', '')) FROM images WHERE dir_id IS NULL
+        """)
+        cursor.execute("""
+            UPDATE images SET dir_id = (
+                SELECT d.id FROM directories d WHERE d.path = rtrim(images.path, replace(images.path, '/', ''))
+            )
+            WHERE dir_id IS NULL
+        """)
+
+    def _migrate_lowercase_tags(self, cursor: sqlite3.Cursor):
+        """
+        Lowercases tag names in databases created before tags were normalized at insert time,
+        merging tags that only differed by case. Runs once, tracked with PRAGMA user_version.
+        """
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] >= 1:
+            return
+
+        # Lowercase in Python, as add_image does; SQLite's lower() only folds ASCII
+        cursor.execute("SELECT id, name FROM tags ORDER BY id")
+        kept_ids: Dict[str, int] = {} # lowercase name -> id of the tag that is kept
+        merged_ids: Dict[int, int] = {} # id of a duplicate tag -> id of the tag it merges into
+        renamed = []
+        for tag_id, name in cursor.fetchall():
+            lowered = name.lower()
+            if lowered in kept_ids:
+                merged_ids[tag_id] = kept_ids[lowered]
+            else:
+                kept_ids[lowered] = tag_id
+                if lowered != name:
+                    renamed.append((lowered, tag_id))
+
+        if merged_ids or renamed:
+            print(f"Migrating database: lowercasing {len(renamed)} tags, merging {len(merged_ids)} duplicates...")
+        # Move associations to the kept tag; those the image already has are left behind and deleted
+        cursor.executemany("UPDATE OR IGNORE image_tags SET tag_id = ? WHERE tag_id = ?",
+                           [(kept_id, dup_id) for dup_id, kept_id in merged_ids.items()])
+        cursor.executemany("DELETE FROM image_tags WHERE tag_id = ?", [(dup_id,) for dup_id in merged_ids])
+        cursor.executemany("DELETE FROM tags WHERE id = ?", [(dup_id,) for dup_id in merged_ids])
+        cursor.executemany("UPDATE tags SET name = ? WHERE id = ?", renamed)
+        cursor.execute("PRAGMA user_version = 1")
+
+    def _get_directory_id(self, cursor: sqlite3.Cursor, normalized_path: str) -> Optional[int]:
+        """Returns the ID of the directory containing an image, adding the directory if needed."""
+        directory_path = normalized_path.rsplit('/', 1)[0] + '/'
+        cursor.execute("INSERT OR IGNORE INTO directories (path) VALUES (?)", (directory_path,))
+        cursor.execute("SELECT id FROM directories WHERE path = ?", (directory_path,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _open_read_conn(self) -> sqlite3.Connection:
+        """
+        Opens a connection returned by get_read_conn() and applies its PRAGMAs once.
+        The connection is opened with mode=ro, so SQLite itself rejects writes
+        (unlike PRAGMA query_only, which can be switched off again).
+        """
+        ro_uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(ro_uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA cache_size = -65536") # 64 MiB page cache, kept warm across queries
+        conn.execute("PRAGMA mmap_size = 268435456") # 256 MiB memory-mapped I/O
+        return conn
+
+    def get_read_conn(self) -> sqlite3.Connection:
+        """
+        Returns the calling thread's read-only connection, opening it on first use.
+        Each thread has its own connection, so no lock is needed to use it.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open_read_conn()
+            self._local.conn = conn
+            with self.lock:
+                self._read_conns.append(conn)
+        return conn
+
+    def close(self):
+        """Closes the read connections of all threads."""
+        with self.lock:
+            for conn in self._read_conns:
+                conn.close()
+            self._read_conns = []
+            # Threads get a new connection if they read again
+            self._local = threading.local()
+
     def image_exists(self, path: str) -> bool:
         """Checks if an image with the given path exists in the database."""
         normalized_path = normalize_path(path)
         try:
-            with self.lock:
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT 1 FROM images WHERE path = ?", (normalized_path,))
-                    return cursor.fetchone() is not None
+            cursor = self.get_read_conn().cursor()
+            cursor.execute("SELECT 1 FROM images WHERE path = ?", (normalized_path,))
+            return cursor.fetchone() is not None
         except sqlite3.Error as e:
             print(f"Error checking if image exists ({normalized_path}): {e}")
             return False # Assume not exists on error
@@ -117,6 +228,7 @@ class Database:
         try:
             with self.lock:
                 with sqlite3.connect(self.db_path) as conn:
+                    conn.execute("PRAGMA synchronous = NORMAL") # Per connection; images are added in bulk
                     cursor = conn.cursor()
                     # --- MODIFICATION HERE: Added COLLATE NOCASE ---
                     cursor.execute("SELECT id, modification_time, file_size, resolution FROM images WHERE path = ? COLLATE NOCASE", (normalized_path,))
@@ -157,8 +269,9 @@ class Database:
                         print(f"Adding new image: {normalized_path}")
                         rating = model.determine_rating(predictions) # Determine rating for new image
                         image_id = str(uuid.uuid4())
-                        cursor.execute("INSERT INTO images (id, path, rating, file_size, modification_time, resolution) VALUES (?, ?, ?, ?, ?, ?)",
-                                       (image_id, normalized_path, rating, current_file_size, current_mod_time, resolution))
+                        dir_id = self._get_directory_id(cursor, normalized_path)
+                        cursor.execute("INSERT INTO images (id, path, rating, file_size, modification_time, resolution, dir_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                       (image_id, normalized_path, rating, current_file_size, current_mod_time, resolution, dir_id))
                         needs_retagging = True # Tag new images
                         needs_thumbnail_update = True
 
@@ -178,8 +291,9 @@ class Database:
 
                         tag_ids_map = {} # Cache tag IDs to reduce queries
 
+                        # Tag names are stored lowercase so searches can match them exactly
                         # Get existing tags first to minimize inserts
-                        tag_names_to_check = {pred.tag for pred in filtered_predictions}
+                        tag_names_to_check = {pred.tag.lower() for pred in filtered_predictions}
                         if tag_names_to_check:
                             placeholders = ','.join('?' for _ in tag_names_to_check)
                             cursor.execute(f"SELECT id, name FROM tags WHERE name IN ({placeholders})", list(tag_names_to_check))
@@ -188,24 +302,27 @@ class Database:
 
                         # Insert new tags and prepare image_tags data
                         image_tags_to_insert = []
+                        inserted_tag_ids = set() # Predictions differing only by case map to the same tag
                         for pred in filtered_predictions:
-                            tag_id = tag_ids_map.get(pred.tag)
+                            tag_name = pred.tag.lower()
+                            tag_id = tag_ids_map.get(tag_name)
                             if tag_id is None:
                                 # Attempt to insert the tag if it wasn't found in our initial bulk fetch
-                                cursor.execute("INSERT OR IGNORE INTO tags (name, category) VALUES (?, ?)", (pred.tag, pred.category))
+                                cursor.execute("INSERT OR IGNORE INTO tags (name, category) VALUES (?, ?)", (tag_name, pred.category))
                                 # Fetch the ID again, whether it was just inserted or ignored (already existed)
-                                cursor.execute("SELECT id FROM tags WHERE name = ?", (pred.tag,))
+                                cursor.execute("SELECT id FROM tags WHERE name = ?", (tag_name,))
                                 tag_id_row = cursor.fetchone()
                                 if tag_id_row:
                                     tag_id = tag_id_row[0]
-                                    tag_ids_map[pred.tag] = tag_id # Cache it for potential future use in this loop
+                                    tag_ids_map[tag_name] = tag_id # Cache it for potential future use in this loop
                                 else:
                                     # This case should be rare if INSERT OR IGNORE works, but handles potential issues
-                                    print(f"Warning: Could not retrieve tag_id for '{pred.tag}' even after INSERT OR IGNORE attempt.")
+                                    print(f"Warning: Could not retrieve tag_id for '{tag_name}' even after INSERT OR IGNORE attempt.")
                                     continue # Skip this tag prediction if we can't get an ID
 
                             # Only append if we successfully got a tag_id
-                            if tag_id is not None:
+                            if tag_id is not None and tag_id not in inserted_tag_ids:
+                                inserted_tag_ids.add(tag_id)
                                 image_tags_to_insert.append((image_id, tag_id, pred.confidence))
 
                         if image_tags_to_insert:
@@ -251,6 +368,7 @@ class Database:
 
                     # Optionally, explicitly remove orphaned tags immediately
                     self.remove_orphaned_tags(conn)
+                    self.remove_orphaned_directories(conn)
 
                     conn.commit()
 
@@ -305,6 +423,7 @@ class Database:
                     # Remove orphaned tags
                     deleted_tag_count = self.remove_orphaned_tags(conn)
                     print(f"Removed {deleted_tag_count} orphaned tags.")
+                    self.remove_orphaned_directories(conn)
 
                     conn.commit()
 
@@ -361,31 +480,41 @@ class Database:
             return 0
 
 
+    def remove_orphaned_directories(self, conn) -> int:
+        """Removes directories that no longer contain any image. Returns count of deleted directories."""
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM directories
+                WHERE NOT EXISTS (SELECT 1 FROM images i WHERE i.dir_id = directories.id)
+            """)
+            # No commit here, assumes called within a transaction
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Error removing orphaned directories: {e}")
+            return 0
+
     def get_image_info_by_path(self, path: str) -> Tuple[Optional[str], List[TagPrediction]]:
         """Retrieves the rating and tags for a given image path."""
         normalized_path = normalize_path(path)
         try:
-            with self.lock:
-                with sqlite3.connect(self.db_path) as conn:
-                    # Read-only access, potentially faster
-                    conn.execute("PRAGMA query_only = ON")
-                    cursor = conn.cursor()
-                    # Use COLLATE NOCASE for case-insensitive path matching
-                    cursor.execute("SELECT id, rating FROM images WHERE path = ? COLLATE NOCASE", (normalized_path,))
-                    row = cursor.fetchone()
-                    if row:
-                        image_id, rating = row
-                        cursor.execute("""
-                            SELECT t.name, t.category, it.confidence
-                            FROM image_tags it
-                            JOIN tags t ON it.tag_id = t.id
-                            WHERE it.image_id = ?
-                            ORDER BY it.confidence DESC -- Optionally order tags
-                        """, (image_id,))
-                        tags = [TagPrediction(tag, confidence, category) for tag, category, confidence in cursor.fetchall()]
-                        return rating, tags
-                    else:
-                        return None, []
+            cursor = self.get_read_conn().cursor()
+            # Use COLLATE NOCASE for case-insensitive path matching
+            cursor.execute("SELECT id, rating FROM images WHERE path = ? COLLATE NOCASE", (normalized_path,))
+            row = cursor.fetchone()
+            if row:
+                image_id, rating = row
+                cursor.execute("""
+                    SELECT t.name, t.category, it.confidence
+                    FROM image_tags it
+                    JOIN tags t ON it.tag_id = t.id
+                    WHERE it.image_id = ?
+                    ORDER BY it.confidence DESC -- Optionally order tags
+                """, (image_id,))
+                tags = [TagPrediction(tag, confidence, category) for tag, category, confidence in cursor.fetchall()]
+                return rating, tags
+            else:
+                return None, []
         except sqlite3.Error as e:
             print(f"Database error getting image info for {normalized_path}: {e}")
             return None, []
@@ -416,97 +545,96 @@ class Database:
             return []
 
         try:
-            with self.lock:
-                with sqlite3.connect(self.db_path) as conn:
-                    conn.execute("PRAGMA query_only = ON")
-                    cursor = conn.cursor()
-
-                    # --- Build subquery to filter image IDs ---
-                    image_id_subquery = "SELECT i.id FROM images i"
-                    image_conditions = []
-                    image_params = []
-
-                    # 1. Desired Directories (OR logic between directories)
-                    dir_conditions = []
-                    for d_dir in desired_dirs:
-                        norm_dir = normalize_path(d_dir)
-                        if not norm_dir.endswith('/'): norm_dir += '/'
-                        dir_conditions.append("i.path LIKE ?")
-                        image_params.append(f"{norm_dir}%")
-                    if dir_conditions:
-                         image_conditions.append("(" + " OR ".join(dir_conditions) + ")")
-
-                    # 2. Undesired Directories (AND NOT logic)
-                    for u_dir in undesired_dirs:
-                        norm_dir = normalize_path(u_dir)
-                        if not norm_dir.endswith('/'): norm_dir += '/'
-                        image_conditions.append("i.path NOT LIKE ?")
-                        image_params.append(f"{norm_dir}%")
-
-                    # 3. Desired Tags (AND logic - image must have ALL desired tags)
-                    if desired_tags:
-                        image_id_subquery += " JOIN image_tags it_d ON i.id = it_d.image_id JOIN tags t_d ON it_d.tag_id = t_d.id"
-                        placeholders = ','.join('?' * len(desired_tags))
-                        image_conditions.append(f"""
-                            i.id IN (
-                                SELECT it_sub.image_id
-                                FROM image_tags it_sub JOIN tags t_sub ON it_sub.tag_id = t_sub.id
-                                WHERE t_sub.name IN ({placeholders})
-                                GROUP BY it_sub.image_id
-                                HAVING COUNT(DISTINCT t_sub.name) = ?
-                            )
-                        """)
-                        image_params.extend(desired_tags)
-                        image_params.append(len(desired_tags))
-
-                    # 4. Undesired Tags (AND NOT logic - image must have NONE of the undesired tags)
-                    if undesired_tags:
-                        placeholders = ','.join('?' * len(undesired_tags))
-                        image_conditions.append(f"""
-                            i.id NOT IN (
-                                SELECT DISTINCT it_sub.image_id
-                                FROM image_tags it_sub JOIN tags t_sub ON it_sub.tag_id = t_sub.id
-                                WHERE t_sub.name IN ({placeholders})
-                            )
-                        """)
-                        image_params.extend(undesired_tags)
-
-                    # Combine image conditions
-                    if image_conditions:
-                        image_id_subquery += " WHERE " + " AND ".join(image_conditions)
-
-                    # --- Build main query to get tag counts ---
-                    final_params = list(image_params) # Copy params used for subquery
-
-                     # --- MODIFICATION: Handle search_term condition ---
-                    search_condition = ""
-                    if search_term:
-                        search_condition = "AND t.name LIKE ? COLLATE NOCASE" # Prefix search
-                        final_params.append(f'{search_term}%') # Append % for prefix match
-                    # If search_term is empty, no t.name condition is added, showing all tags
-                    # --- END MODIFICATION ---
-
-                    # Add LIMIT clause
-                    limit_clause = f"LIMIT {int(limit)}" if limit is not None and limit > 0 else ""
-
-                    tag_query = f"""
-                    SELECT t.name, COUNT(DISTINCT it.image_id) as count
-                    FROM tags t
-                    JOIN image_tags it ON t.id = it.tag_id
-                    WHERE it.image_id IN ({image_id_subquery})
-                    {search_condition}
-                    GROUP BY t.name
-                    ORDER BY count DESC, t.name ASC
-                    {limit_clause}
-                    """
-
-                    # print(f"Database: Executing SQL query: {tag_query}")
-                    # print(f"Database: Query parameters: {final_params}")
-
-                    cursor.execute(tag_query, final_params)
-                    result = cursor.fetchall()
-                    print(f"Database: Tag matching query returned {len(result)} tags.")
-                    return result
+            cursor = self.get_read_conn().cursor()
+
+            # --- Build subquery to filter image IDs ---
+            image_id_subquery = "SELECT i.id FROM images i"
+            image_conditions = []
+            image_params = []
+
+            # 1. Desired Directories (OR logic between directories)
+            dir_conditions = []
+            for d_dir in desired_dirs:
+                norm_dir = normalize_path(d_dir)
+                if not norm_dir.endswith('/'): norm_dir += '/'
+                dir_conditions.append("i.path LIKE ?")
+                image_params.append(f"{norm_dir}%")
+            if dir_conditions:
+                 image_conditions.append("(" + " OR ".join(dir_conditions) + ")")
+
+            # 2. Undesired Directories (AND NOT logic)
+            for u_dir in undesired_dirs:
+                norm_dir = normalize_path(u_dir)
+                if not norm_dir.endswith('/'): norm_dir += '/'
+                image_conditions.append("i.path NOT LIKE ?")
+                image_params.append(f"{norm_dir}%")
+
+            # 3. Desired Tags (AND logic - image must have ALL desired tags)
+            if desired_tags:
+                # Tag names are stored lowercase; deduplicate after lowercasing so the count can match
+                desired_names = list(dict.fromkeys(tag.lower() for tag in desired_tags))
+                image_id_subquery += " JOIN image_tags it_d ON i.id = it_d.image_id JOIN tags t_d ON it_d.tag_id = t_d.id"
+                placeholders = ','.join('?' * len(desired_names))
+                image_conditions.append(f"""
+                    i.id IN (
+                        SELECT it_sub.image_id
+                        FROM image_tags it_sub JOIN tags t_sub ON it_sub.tag_id = t_sub.id
+                        WHERE t_sub.name IN ({placeholders})
+                        GROUP BY it_sub.image_id
+                        HAVING COUNT(DISTINCT t_sub.name) = ?
+                    )
+                """)
+                image_params.extend(desired_names)
+                image_params.append(len(desired_names))
+
+            # 4. Undesired Tags (AND NOT logic - image must have NONE of the undesired tags)
+            if undesired_tags:
+                placeholders = ','.join('?' * len(undesired_tags))
+                image_conditions.append(f"""
+                    i.id NOT IN (
+                        SELECT DISTINCT it_sub.image_id
+                        FROM image_tags it_sub JOIN tags t_sub ON it_sub.tag_id = t_sub.id
+                        WHERE t_sub.name IN ({placeholders})
+                    )
+                """)
+                image_params.extend(tag.lower() for tag in undesired_tags)
+
+            # Combine image conditions
+            if image_conditions:
+                image_id_subquery += " WHERE " + " AND ".join(image_conditions)
+
+            # --- Build main query to get tag counts ---
+            final_params = list(image_params) # Copy params used for subquery
+
+             # --- MODIFICATION: Handle search_term condition ---
+            search_condition = ""
+            if search_term:
+                search_condition = "AND t.name LIKE ? COLLATE NOCASE" # Prefix search
+                final_params.append(f'{search_term}%') # Append % for prefix match
+            # If search_term is empty, no t.name condition is added, showing all tags
+            # --- END MODIFICATION ---
+
+            # Add LIMIT clause
+            limit_clause = f"LIMIT {int(limit)}" if limit is not None and limit > 0 else ""
+
+            tag_query = f"""
+            SELECT t.name, COUNT(DISTINCT it.image_id) as count
+            FROM tags t
+            JOIN image_tags it ON t.id = it.tag_id
+            WHERE it.image_id IN ({image_id_subquery})
+            {search_condition}
+            GROUP BY t.name
+            ORDER BY count DESC, t.name ASC
+            {limit_clause}
+            """
+
+            # print(f"Database: Executing SQL query: {tag_query}")
+            # print(f"Database: Query parameters: {final_params}")
+
+            cursor.execute(tag_query, final_params)
+            result = cursor.fetchall()
+            print(f"Database: Tag matching query returned {len(result)} tags.")
+            return result
 
         except sqlite3.Error as e:
             print(f"Database error getting matching tags: {e}")
@@ -519,21 +647,18 @@ class Database:
         """Retrieves the UUID for a given image path."""
         normalized_path = normalize_path(path)
         try:
-            with self.lock:
-                with sqlite3.connect(self.db_path) as conn:
-                    conn.execute("PRAGMA query_only = ON")
-                    cursor = conn.cursor()
-                    # Use COLLATE NOCASE for case-insensitive path matching
-                    cursor.execute("SELECT id FROM images WHERE path = ? COLLATE NOCASE", (normalized_path,))
-                    row = cursor.fetchone()
-                    return row[0] if row else None
+            cursor = self.get_read_conn().cursor()
+            # Use COLLATE NOCASE for case-insensitive path matching
+            cursor.execute("SELECT id FROM images WHERE path = ? COLLATE NOCASE", (normalized_path,))
+            row = cursor.fetchone()
+            return row[0] if row else None
         except sqlite3.Error as e:
             print(f"Database error getting image ID for {normalized_path}: {e}")
 
     def get_resolutions_for_paths(self, paths: List[str]) -> dict[str, Optional[str]]:
         """
         Retrieves the resolution string for a list of image paths efficiently
-        using a temporary table and JOIN.
+        with a single query joining images with the paths bound as a JSON array.
         """
         if not paths:
             return {}
@@ -556,50 +681,34 @@ class Database:
 
         db_resolutions: Dict[str, Optional[str]] = {} # {normalized_path_from_db: resolution}
         try:
-            with self.lock:
-                # Use a single connection for the temporary table lifecycle
-                with sqlite3.connect(self.db_path, isolation_level=None) as conn: # Autocommit mode for temp table
-                    cursor = conn.cursor()
-                    try:
-                        # Create a temporary table
-                        cursor.execute("CREATE TEMP TABLE temp_paths_to_query (path TEXT PRIMARY KEY)")
-
-                        # Insert normalized paths into the temporary table
-                        # executemany expects a list of tuples
-                        paths_to_insert = [(p,) for p in unique_normalized_paths]
-                        cursor.executemany("INSERT INTO temp_paths_to_query (path) VALUES (?)", paths_to_insert)
-
-                        # Query by joining images with the temporary table
-                        # Use COLLATE NOCASE on the JOIN condition
-                        query = """
-                            SELECT i.path, i.resolution
-                            FROM images i
-                            JOIN temp_paths_to_query t ON i.path = t.path COLLATE NOCASE
-                        """
-                        cursor.execute(query)
-                        fetched_rows = cursor.fetchall()
-
-                    finally:
-                        # Ensure temporary table is dropped even if errors occur
-                        try:
-                            cursor.execute("DROP TABLE temp_paths_to_query")
-                        except sqlite3.Error as drop_err:
-                            # Log error if dropping fails, but don't raise over original error
-                            print(f"Warning: Could not drop temporary table temp_paths_to_query: {drop_err}")
+            cursor = self.get_read_conn().cursor()
+            # The paths are bound as a single JSON array expanded by json_each, so no
+            # temporary table (and no write) is needed on the read-only connection.
+            # Stored paths are normalized, i.e. already lowercase, so a plain equality
+            # seeks the UNIQUE index on images.path once per requested path (COLLATE NOCASE
+            # can't use that index and would scan images for every path). CROSS JOIN keeps
+            # json_each as the outer loop.
+            query = """
+                SELECT i.path, i.resolution
+                FROM json_each(?) t
+                CROSS JOIN images i ON i.path = t.value
+            """
+            cursor.execute(query, (json.dumps(list(unique_normalized_paths)),))
+            fetched_rows = cursor.fetchall()
 
             # Populate the lookup dictionary using normalized paths from the DB results
             for db_path, resolution in fetched_rows:
                 if db_path: # Ensure path from DB is not null/empty
                     db_resolutions[normalize_path(db_path)] = resolution # Store using normalized key
 
-            print(f"DEBUG: get_resolutions_for_paths - Fetched {len(db_resolutions)} resolutions for {len(unique_normalized_paths)} unique requested paths using TEMP TABLE.")
+            print(f"DEBUG: get_resolutions_for_paths - Fetched {len(db_resolutions)} resolutions for {len(unique_normalized_paths)} unique requested paths using json_each.")
 
         except sqlite3.Error as e:
-            print(f"Database error fetching specific resolutions using TEMP TABLE: {e}")
+            print(f"Database error fetching specific resolutions using json_each: {e}")
             # Return dict with Nones if DB fetch fails
             return results
         except Exception as e:
-            print(f"Unexpected error fetching specific resolutions using TEMP TABLE: {e}")
+            print(f"Unexpected error fetching specific resolutions using json_each: {e}")
             return results
 
         # Map the fetched resolutions back to the original input paths
@@ -608,14 +717,14 @@ class Database:
             resolution = db_resolutions.get(normalized_key) # Lookup using normalized key
             if resolution is None:
                  # This normalized path was queried but not found in the DB results
-                 print(f"DEBUG: get_resolutions_for_paths - Normalized path '{normalized_key}' not found in DB results (TEMP TABLE method).")
+                 print(f"DEBUG: get_resolutions_for_paths - Normalized path '{normalized_key}' not found in DB results (json_each method).")
                  missing_count += 1
             # Assign the found resolution (or None) to all original paths that normalized to this key
             for original_path in original_paths_list:
                 results[original_path] = resolution
 
         if missing_count > 0:
-            print(f"DEBUG: get_resolutions_for_paths - {missing_count} queried normalized paths were not found in the DB (TEMP TABLE method).")
+            print(f"DEBUG: get_resolutions_for_paths - {missing_count} queried normalized paths were not found in the DB (json_each method).")
 
         return results
 
@@ -625,12 +734,9 @@ class Database:
         if not directory_path.endswith('/'):
             directory_path += '/'
         try:
-            with self.lock:
-                with sqlite3.connect(self.db_path) as conn:
-                    conn.execute("PRAGMA query_only = ON")
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT id FROM images WHERE path LIKE ?", (f"{directory_path}%",))
-                    return [row[0] for row in cursor.fetchall()]
+            cursor = self.get_read_conn().cursor()
+            cursor.execute("SELECT id FROM images WHERE path LIKE ?", (f"{directory_path}%",))
+            return [row[0] for row in cursor.fetchall()]
         except sqlite3.Error as e:
             print(f"Database error getting image IDs in directory {directory_path}: {e}")
             return []
\ No newline at end of file
@@ -21,10 +21,11 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtGui import (
     QPixmap, QDragEnterEvent, QDropEvent, QShortcut, QImage, # Added QImage
-    QIcon, QTextCursor, QAction, QKeyEvent
+    QIcon, QTextCursor, QAction, QKeyEvent, QPixmapCache
 )
 from PyQt6.QtCore import (
-    Qt, QTimer, pyqtSignal, QObject, pyqtSlot, QRunnable, QThreadPool, QSize, QMimeData # Added QMimeData
+    Qt, QTimer, pyqtSignal, QObject, pyqtSlot, QRunnable, QThreadPool, QSize, QMimeData, # Added QMimeData
+    QEvent
 )
 from PIL import Image, UnidentifiedImageError
 
@@ -102,6 +103,8 @@ class ImageGallery(QMainWindow):
         self.last_selected_image_path: Optional[str] = None
         self.suppress_search_on_dropdown_update: bool = False
         self.active_directories: Set[str] = set()
+        # Normalized copy of active_directories for searches, rebuilt only when the selection changes
+        self._normalized_selected_dirs: frozenset[str] = frozenset()
         self.is_processing: bool = False
         self.processed_directories: List[str] = []
         self.total_images_to_process: int = 0
@@ -113,6 +116,10 @@ class ImageGallery(QMainWindow):
         self.page_size: int = 50
         self.target_height: int = 250 # Default row height
         self.thumbnail_loaders: Dict[int, Tuple[ImageLabel, str]] = {}
+        self._label_to_path: Dict[ImageLabel, str] = {} # Labels on the current page
+        self._image_context_menu: Optional[QMenu] = None # Shared by all labels, see _get_image_context_menu
+        self._context_target: Optional[ImageLabel] = None # Label whose context menu is open
+        self._context_path: Optional[str] = None # Image path of that label, from _label_to_path
         self._temp_pred_callback: Optional[Callable] = None # For drag-drop predictions
         self._suggestions_map: Dict[str, str] = {}
         self._ignore_cursor_change_on_focus = False
@@ -201,6 +208,7 @@ class ImageGallery(QMainWindow):
                 except Exception as e:
                     print(f"Error parsing directory from path '{path_str}': {e}")
             print(f"Initial active directories: {self.active_directories}")
+            self._update_normalized_selected_dirs()
         except sqlite3.Error as e:
             print(f"Error loading initial directories from DB: {e}")
 
@@ -316,6 +324,8 @@ class ImageGallery(QMainWindow):
         self.scroll_layout.setSpacing(10)
         self.scroll_area.setWidget(self.scroll_content)
         self.right_panel_layout.addWidget(self.scroll_area)
+        # Context menus for all image labels are handled here, see eventFilter
+        self.scroll_area.viewport().installEventFilter(self)
 
         # --- Slideshow Controls (Moved Here) ---
         self.slideshow_frame = QFrame() # Store as instance variable if needed elsewhere
@@ -430,6 +440,55 @@ class ImageGallery(QMainWindow):
         # We need to find where ManageDirectoriesDialog is instantiated and connect its signal
         # We will connect it when the dialog is opened in `open_manage_directories_dialog`
     
+    # --- Image Label Context Menu & Tooltip ---
+    def _get_image_context_menu(self) -> QMenu:
+        """
+        Returns the context menu shared by all image labels, building it on first use.
+        Actions dispatch to self._context_target, the label that was right-clicked,
+        and self._context_path, its image path.
+        """
+        if self._image_context_menu is None:
+            menu = QMenu(self)
+
+            # --- Standard Actions ---
+            menu.addAction("Open in default viewer").triggered.connect(lambda: self._context_target.open_in_image_viewer())
+            menu.addAction("Show in file browser").triggered.connect(lambda: self._context_target.open_in_file_browser())
+            menu.addAction("Copy image filename").triggered.connect(lambda: self._context_target.copy_image_name())
+            menu.addAction("Copy image").triggered.connect(lambda: self._copy_image_to_clipboard(self._context_path))
+            menu.addAction("Copy tags").triggered.connect(lambda: self._copy_tags_to_clipboard(self._context_path))
+            menu.addAction("Export as JPG...").triggered.connect(lambda: self._context_target.export_as_jpg())
+
+            menu.addSeparator()
+
+            # --- Similarity Search ---
+            menu.addAction("Search Similar Images").triggered.connect(lambda: self._context_target.search_similar_images())
+
+            self._image_context_menu = menu
+        return self._image_context_menu
+
+    def _image_label_at(self, viewport_pos) -> Optional[ImageLabel]:
+        """Returns the image label under a position in the gallery viewport, if any."""
+        child = self.scroll_area.viewport().childAt(viewport_pos)
+        return child if child in self._label_to_path else None
+
+    def eventFilter(self, watched_object: QObject, event: QEvent) -> bool:
+        """Shows the shared context menu for image labels in the gallery viewport."""
+        if watched_object is self.scroll_area.viewport():
+            if event.type() == QEvent.Type.ContextMenu:
+                label = self._image_label_at(event.pos())
+                if label is not None:
+                    self._context_target = label
+                    self._context_path = self._label_to_path[label]
+                    try:
+                        # Actions are triggered synchronously while the menu is open
+                        self._get_image_context_menu().exec(event.globalPos())
+                    finally:
+                        # Don't keep a reference to a label that may be deleted on the next page change
+                        self._context_target = None
+                        self._context_path = None
+                    return True
+        return super().eventFilter(watched_object, event)
+
     # --- Helper Method for Context Menu Actions ---
     def search_similar_images(self, image_path: str):
         """Initiates a similarity search based on the provided image path."""
@@ -493,10 +552,16 @@ class ImageGallery(QMainWindow):
     def update_active_directories_from_dialog(self, new_active_set: Set[str]):
         if self.active_directories != new_active_set:
             print(f"Updating active directories from dialog: {new_active_set}")
-            self.active_directories = new_active_set
+            # Keep a copy: the dialog emits its own set and keeps editing it in place
+            self.active_directories = set(new_active_set)
+            self._update_normalized_selected_dirs()
             self.perform_search()
             self.update_suggestions()
 
+    def _update_normalized_selected_dirs(self):
+        """Normalizes the active directories once per selection change, for use by searches."""
+        self._normalized_selected_dirs = frozenset(normalize_path(d) for d in self.active_directories)
+
     # --- Gallery Display Logic ---
     def arrange_rows(self):
         print("Arrange rows called")
@@ -513,6 +578,7 @@ class ImageGallery(QMainWindow):
                 # del item # Not usually necessary
 
         self.thumbnail_loaders.clear()
+        self._label_to_path.clear()
         # Force processing events to help with immediate clearing if needed
         # QApplication.processEvents()
 
@@ -582,6 +648,7 @@ class ImageGallery(QMainWindow):
 
                 # Add the current image to the new/current row
                 label = ImageLabel(img_path, self.handle_image_click, self)
+                self._label_to_path[label] = img_path
                 current_row_widgets.append(label)
                 current_row_width += img_width_at_target
 
@@ -666,14 +733,16 @@ class ImageGallery(QMainWindow):
             # Load thumbnail
             image_id = self.db.get_image_id_from_path(label.image_path)
             if image_id:
-                 self.thumbnail_loaders[image_id] = label # Store reference
-                 # Create and start the loader
-                 loader = ThumbnailLoader(image_id, label.image_path, img_width, img_height, self.thumbnail_cache)
-                 loader.signals.thumbnailLoaded.connect(self.thumbnailLoaded.emit)
-                 loader.signals.thumbnailError.connect(
-                     lambda img_id=image_id, err_msg="": print(f"Thumb load error for {img_id}: {err_msg}")
-                 )
-                 self.threadpool.start(loader)
+                 # Reuse the pixmap if it was already loaded at this size (e.g. revisiting a page)
+                 if not label.set_cached_thumbnail(image_id):
+                     self.thumbnail_loaders[image_id] = label # Store reference
+                     # Create and start the loader
+                     loader = ThumbnailLoader(image_id, label.image_path, img_width, img_height, self.thumbnail_cache)
+                     loader.signals.thumbnailLoaded.connect(self.thumbnailLoaded.emit)
+                     loader.signals.thumbnailError.connect(
+                         lambda img_id=image_id, err_msg="": print(f"Thumb load error for {img_id}: {err_msg}")
+                     )
+                     self.threadpool.start(loader)
             else:
                  # Fallback if image not in DB (should be less common now)
                  label.setText("?")
@@ -696,9 +765,8 @@ class ImageGallery(QMainWindow):
         if image_id in self.thumbnail_loaders:
             label = self.thumbnail_loaders[image_id] # Get the label object
             if label: # Check if label still exists (it might have been scrolled away)
-                # Scale pixmap to fit the label's fixed size
-                scaled_pixmap = pixmap.scaled(label.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                label.setPixmap(scaled_pixmap)
+                # Scales the pixmap to the label's fixed size and caches it for later pages
+                label.set_thumbnail(image_id, pixmap)
             # Remove the entry regardless of whether the label still exists
             del self.thumbnail_loaders[image_id]
         else:
@@ -1185,6 +1253,7 @@ class ImageGallery(QMainWindow):
         print("All directory processing finished.")
         self.is_processing = False
         self.set_ui_enabled(True)
+        QPixmapCache.clear() # Thumbnails may have been regenerated
         try:
             if status_callback:=getattr(self, 'updateInfoTextSignal', None): status_callback.emit("Cleaning database...\n")
             self.db.cleanup_database()
@@ -1384,6 +1453,7 @@ class ImageGallery(QMainWindow):
         print("Image reprocessing finished.")
         self.set_ui_enabled(True)
         self.updateInfoTextSignal.emit("Image reprocessing complete.\n")
+        QPixmapCache.clear() # Thumbnails may have been regenerated
         self.perform_search()
 
     def on_reprocessing_error(self, error_info: tuple):
@@ -1709,7 +1779,7 @@ class ImageGallery(QMainWindow):
     def _perform_normal_search(self, search_query: str) -> List[str]:
         print(f"ImageGallery: _perform_normal_search query: '{search_query}'")
         parser = SearchQueryParser(); ast = parser.parse(search_query)
-        evaluator = SearchQueryEvaluator(self.db, self.active_directories)
+        evaluator = SearchQueryEvaluator(self.db, self._normalized_selected_dirs)
         image_ids = evaluator.evaluate(ast)
         image_paths = self._get_image_paths_from_ids(image_ids)
         print(f"  Normal search found {len(image_paths)} paths.")
@@ -1723,7 +1793,7 @@ class ImageGallery(QMainWindow):
         if not base_image_paths: return []
 
         reference_tags: Set[str]
-        if tags: reference_tags = {tag.tag for tag in tags}; print(f"  Using {len(reference_tags)} temporary tags.")
+        if tags: reference_tags = {tag.tag.lower() for tag in tags}; print(f"  Using {len(reference_tags)} temporary tags.")
         else:
             _, db_tags = self.db.get_image_info_by_path(similar_image_path)
             if db_tags is None: print(f"  Warning: Could not get tags for ref image {similar_image_path}"); return []
@@ -2094,5 +2164,6 @@ class ImageGallery(QMainWindow):
     def closeEvent(self, event):
         self.stop_slideshow() # Ensure slideshow stops cleanly
         self.unload_model_safely()
+        self.db.close()
         # Wait for threadpool to finish?
         # self.threadpool.waitForDone()
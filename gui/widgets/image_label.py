@@ -4,8 +4,9 @@ import subprocess
 from pathlib import Path
 from typing import Callable, TYPE_CHECKING
 
-from PyQt6.QtWidgets import QLabel, QMenu, QApplication, QSizePolicy
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QLabel, QApplication, QSizePolicy, QToolTip
+from PyQt6.QtCore import Qt, QEvent
+from PyQt6.QtGui import QPixmap, QPixmapCache
 
 # Use TYPE_CHECKING to avoid circular imports for type hints
 if TYPE_CHECKING:
@@ -13,10 +14,21 @@ if TYPE_CHECKING:
     from gui.main_window import ImageGallery
     # from dialogs.export_jpg import ExportAsJPGDialog # Removed, imported locally
 
+def _launch_detached(args: list):
+    """
+    Starts an external helper (file browser, image viewer) without waiting for it,
+    so the GUI thread isn't blocked while it starts up.
+    """
+    subprocess.Popen(args, close_fds=True, stdin=subprocess.DEVNULL,
+                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+# ExportAsJPGDialog, imported lazily on first use by ImageLabel.export_as_jpg
+_ExportAsJPGDialog = None
+
 class ImageLabel(QLabel):
     """
     A custom QLabel specifically for displaying image thumbnails in the gallery.
-    Handles mouse clicks and context menu actions for the image.
+    Handles mouse clicks and implements the gallery's context menu actions for the image.
     """
     def __init__(self, image_path: str, on_click_callback: Callable[..., None], gallery: 'ImageGallery'):
         """
@@ -34,13 +46,42 @@ class ImageLabel(QLabel):
         # often gallery.handle_image_click, passing self.image_path
         self.on_click_callback = on_click_callback
         self.gallery = gallery
-        self.setToolTip(image_path) # Show full path on hover
+        # No setToolTip() here: the path tooltip is shown on demand by event(),
+        # and the context menu is handled by the gallery's viewport event filter.
         # Allow the label to expand horizontally and vertically
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         # Ensure the pixmap scales nicely within the label
         self.setScaledContents(False) # Let the pixmap scaling handle aspect ratio
         self.setAlignment(Qt.AlignmentFlag.AlignCenter) # Center the image
 
+    def event(self, event):
+        """Shows the full image path as a tooltip, computed only when the user hovers."""
+        if event.type() == QEvent.Type.ToolTip:
+            QToolTip.showText(event.globalPos(), self.image_path, self)
+            return True
+        return super().event(event)
+
+    def _thumbnail_cache_key(self, image_id: str) -> str:
+        """QPixmapCache key for this image's thumbnail at the label's current size."""
+        return f"thumb:{image_id}:{self.width()}x{self.height()}"
+
+    def set_cached_thumbnail(self, image_id: str) -> bool:
+        """
+        Shows the thumbnail from QPixmapCache if it was already loaded at this size.
+        Returns True on a cache hit, False if it still needs to be loaded.
+        """
+        pixmap = QPixmapCache.find(self._thumbnail_cache_key(image_id))
+        if pixmap is None or pixmap.isNull():
+            return False
+        self.setPixmap(pixmap)
+        return True
+
+    def set_thumbnail(self, image_id: str, pixmap: QPixmap):
+        """Scales a loaded thumbnail to the label, shows it and stores it in QPixmapCache."""
+        scaled_pixmap = pixmap.scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        QPixmapCache.insert(self._thumbnail_cache_key(image_id), scaled_pixmap)
+        self.setPixmap(scaled_pixmap)
+
     def mousePressEvent(self, event):
         """Handles left-click events to trigger the callback."""
         if event.button() == Qt.MouseButton.LeftButton:
@@ -52,52 +93,16 @@ class ImageLabel(QLabel):
         # Pass other mouse events to the base class
         super().mousePressEvent(event)
 
-    def contextMenuEvent(self, event):
-        """Creates and shows a context menu for image actions."""
-        menu = QMenu(self)
-
-        # --- Standard Actions ---
-        open_in_viewer_action = menu.addAction("Open in default viewer")
-        open_in_browser_action = menu.addAction("Show in file browser")
-        copy_name_action = menu.addAction("Copy image filename")
-        copy_image_action = menu.addAction("Copy image") # ADDED
-        copy_tags_action = menu.addAction("Copy tags") # ADDED
-        export_jpg_action = menu.addAction("Export as JPG...")
-
-        menu.addSeparator()
-
-        # --- Similarity Search ---
-        search_similar_action = menu.addAction("Search Similar Images")
-
-        # --- Execute Menu ---
-        action = menu.exec(self.mapToGlobal(event.pos()))
-
-        # --- Handle Selected Action ---
-        if action == open_in_viewer_action:
-            self.open_in_image_viewer()
-        elif action == open_in_browser_action:
-            self.open_in_file_browser()
-        elif action == copy_name_action:
-            self.copy_image_name()
-        elif action == export_jpg_action:
-            self.export_as_jpg()
-        elif action == copy_image_action: # ADDED
-            self.gallery._copy_image_to_clipboard(self.image_path) # ADDED
-        elif action == copy_tags_action: # ADDED
-            self.gallery._copy_tags_to_clipboard(self.image_path) # ADDED
-        elif action == search_similar_action:
-            self.search_similar_images()
-
     def open_in_image_viewer(self):
         """Opens the image file using the system's default application."""
         try:
             if sys.platform == "win32":
                 os.startfile(self.image_path)
             elif sys.platform == "darwin": # macOS
-                subprocess.run(["open", self.image_path], check=True)
+                _launch_detached(["open", self.image_path])
             else: # Linux and other POSIX
-                subprocess.run(["xdg-open", self.image_path], check=True)
-        except Exception as e:
+                _launch_detached(["xdg-open", self.image_path])
+        except OSError as e:
             print(f"Error opening image in viewer: {e}")
             # Optionally show a message box to the user in the gallery
             # self.gallery.show_status_message(f"Error opening image: {e}")
@@ -112,13 +117,13 @@ class ImageLabel(QLabel):
 
             if sys.platform == "win32":
                 # Use explorer with /select to highlight the file
-                subprocess.run(["explorer", "/select,", str(file_path)], check=True)
+                _launch_detached(["explorer", "/select,", str(file_path)])
             elif sys.platform == "darwin": # macOS
                 # Use open with -R to reveal the file in Finder
-                subprocess.run(["open", "-R", str(file_path)], check=True)
+                _launch_detached(["open", "-R", str(file_path)])
             else: # Linux - open the containing directory
-                subprocess.run(["xdg-open", str(file_path.parent)], check=True)
-        except Exception as e:
+                _launch_detached(["xdg-open", str(file_path.parent)])
+        except OSError as e:
             print(f"Error opening file browser: {e}")
             # self.gallery.show_status_message(f"Error showing file: {e}")
 
@@ -141,11 +146,15 @@ class ImageLabel(QLabel):
         # We need to import the dialog class here to avoid circular imports at module level
         # This is slightly less clean but necessary if dialogs depend on widgets or vice-versa indirectly.
         # A better approach might involve signal/slot connections or passing data differently.
+        # The class is cached at module level after the first import.
+        global _ExportAsJPGDialog
         try:
-            from ..dialogs.export_jpg import ExportAsJPGDialog
+            if _ExportAsJPGDialog is None:
+                from ..dialogs.export_jpg import ExportAsJPGDialog
+                _ExportAsJPGDialog = ExportAsJPGDialog
             # Pass self (the ImageLabel) or self.gallery as the parent?
             # Passing self.gallery might be better for modality.
-            export_dialog = ExportAsJPGDialog(self.gallery, self.image_path)
+            export_dialog = _ExportAsJPGDialog(self.gallery, self.image_path)
             export_dialog.exec() # Show dialog modally
         except ImportError:
              print("Error: Could not import ExportAsJPGDialog.")
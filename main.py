@@ -6,7 +6,7 @@ from pathlib import Path
 # Imports - Assuming run.bat has installed requirements, these should succeed.
 # If they fail here, it indicates a deeper issue (e.g., corrupted install).
 from PyQt6.QtWidgets import QApplication, QMessageBox # Keep QMessageBox for error popups
-from PyQt6.QtGui import QIcon, QImageReader
+from PyQt6.QtGui import QIcon, QImageReader, QPixmapCache
 from gui.main_window import ImageGallery
 from gui.dialogs.requirements_dialog import RequirementsDialog # Keep dialog import
 import config
@@ -33,6 +33,8 @@ def main():
 
     # Remove Qt's image allocation limit if dealing with many large images
     QImageReader.setAllocationLimit(0)
+    # Keep up to 128 MiB of scaled gallery thumbnails in memory (see ImageLabel.set_thumbnail)
+    QPixmapCache.setCacheLimit(128 * 1024)
 
     # --- Create and Show Main Window ---
     # No pre-check here anymore. If ImageGallery import failed earlier,
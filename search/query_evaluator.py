@@ -1,8 +1,6 @@
+import json
 import sqlite3
-from typing import Set, TYPE_CHECKING
-
-# Import utility function
-from utils.path_utils import normalize_path
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple, TYPE_CHECKING
 
 # Import AST node types from the parser module
 from .query_parser import ASTNode, TagNode, AndNode, OrNode, NotNode, BracketNode, AllImagesNode
@@ -11,140 +9,481 @@ from .query_parser import ASTNode, TagNode, AndNode, OrNode, NotNode, BracketNod
 if TYPE_CHECKING:
     from database.db_manager import Database
 
+def _prefix_upper_bound(prefix: str) -> str:
+    """
+    Returns the smallest string that sorts after every string starting with prefix,
+    so that `path >= prefix AND path < bound` selects the same rows as `path LIKE 'prefix%'`
+    while letting SQLite seek the path index (e.g. 'foo/' -> 'foo0').
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def _first_column(cursor: sqlite3.Cursor, row: tuple):
+    """Row factory returning the single selected column instead of a one-tuple."""
+    return row[0]
+
 class SearchQueryEvaluator:
     """
     Evaluates an AST generated by SearchQueryParser against the database
     to retrieve a set of matching image IDs.
     """
-    def __init__(self, db: 'Database', selected_directories: Set[str]):
+    # Directory scope on images.dir_id; the IDs are bound as one JSON array parameter
+    _DIR_WHERE = "dir_id IN (SELECT value FROM json_each(?))"
+    # Tag names are stored lowercase, so matching is an exact lookup on tags.name
+    _TAG_SQL = f"""
+        SELECT it.image_id
+        FROM image_tags it
+        JOIN tags t ON it.tag_id = t.id
+        JOIN images i ON it.image_id = i.id
+        WHERE t.name = ? AND i.{_DIR_WHERE}
+    """
+    # Image IDs of several tags at once; the names are bound as one JSON array
+    _TAGS_SQL = f"""
+        SELECT t.name, it.image_id
+        FROM image_tags it
+        JOIN tags t ON it.tag_id = t.id
+        JOIN images i ON it.image_id = i.id
+        WHERE t.name IN (SELECT value FROM json_each(?)) AND i.{_DIR_WHERE}
+    """
+    _WITHOUT_TAG_SQL = f"""
+        SELECT id FROM images
+        WHERE {_DIR_WHERE} AND id NOT IN (
+            SELECT it.image_id
+            FROM image_tags it
+            JOIN tags t ON it.tag_id = t.id
+            WHERE t.name = ?
+        )
+    """
+    _SCOPE_SQL = f"SELECT id FROM images WHERE {_DIR_WHERE}"
+    # The IDs are bound as a single JSON array expanded by json_each, so the statement
+    # stays the same size regardless of how many IDs are passed (no per-ID placeholders,
+    # no SQLITE_MAX_VARIABLE_NUMBER limit) and each ID is an index probe on images.id.
+    _FILTER_SQL = f"SELECT id FROM images WHERE id IN (SELECT value FROM json_each(?)) AND {_DIR_WHERE}"
+    # Node types that evaluate_to_sql translates to a single SELECT (not a compound)
+    _SIMPLE_SELECT_NODES = (TagNode, AllImagesNode, NotNode)
+
+    def __init__(self, db: 'Database', selected_directories: FrozenSet[str], use_sql: bool = True):
         """
         Initializes the evaluator.
 
         Args:
             db: An instance of the Database manager.
-            selected_directories: A set of normalized directory paths currently active.
-                                   Used to scope the search (especially for NOT queries).
+            selected_directories: The normalized directory paths currently active (see
+                                  normalize_path). Used to scope the search (especially for NOT queries).
+            use_sql: If True, the whole query is translated to a single SQL statement.
+                     If False, each node is queried separately and combined in Python
+                     (slower, kept for debugging).
         """
         self.db = db
-        # Store normalized selected directories
-        self.selected_directories = {normalize_path(d) for d in selected_directories}
+        self.use_sql = use_sql
+        # Results memoized during a single evaluate() call
+        self._scope_cache: Optional[Set[str]] = None
+        self._tag_cache: Dict[str, Set[str]] = {}
+        # Per node type handlers, looked up with type(node) instead of an isinstance chain:
+        # _eval_* translate a node to SQL, _step_* perform one step of the Python walk
+        self._dispatch: Dict[type, Callable[[ASTNode], Tuple[str, List]]] = {
+            TagNode: self._eval_tag,
+            AndNode: self._eval_and,
+            OrNode: self._eval_or,
+            NotNode: self._eval_not,
+            BracketNode: self._eval_bracket,
+            AllImagesNode: self._eval_all,
+        }
+        self._steps: Dict[type, Callable[[ASTNode, int, list, list], None]] = {
+            TagNode: self._step_tag,
+            AndNode: self._step_and,
+            OrNode: self._step_or,
+            NotNode: self._step_not,
+            BracketNode: self._step_bracket,
+            AllImagesNode: self._step_all,
+        }
+        self.set_selected_directories(selected_directories)
+
+    def set_selected_directories(self, selected_directories: FrozenSet[str]):
+        """
+        Sets the directories that scope the search and invalidates cached results.
+
+        Args:
+            selected_directories: The normalized directory paths currently active.
+                                  They are used as-is; callers normalize them once when they change.
+        """
+        self.selected_directories = selected_directories
+        self._clear_caches()
+
+        # The directory scope only changes here, so resolve it to the IDs of every
+        # directory at or below the selected ones once per change. Queries then filter
+        # on the small integer images.dir_id instead of matching path prefixes. The IDs
+        # are bound as one JSON array, so a tree with thousands of subfolders stays a
+        # single parameter (no SQLITE_MAX_VARIABLE_NUMBER limit).
+        self._dir_ids: List[int] = sorted(self._resolve_directory_ids())
+        self._dir_params = [json.dumps(self._dir_ids)]
+
+    def _resolve_directory_ids(self) -> Set[int]:
+        """Returns the IDs of the directories within the selected directories (recursive)."""
+        if not self.selected_directories:
+            return set()
+
+        # One indexed range scan of the directories table per selected directory
+        dir_params = []
+        for norm_dir in self.selected_directories:
+            if not norm_dir.endswith('/'): norm_dir += '/'
+            dir_params.extend([norm_dir, _prefix_upper_bound(norm_dir)])
+        query = " UNION ALL ".join(["SELECT id FROM directories WHERE path >= ? AND path < ?"] * len(self.selected_directories))
+
+        try:
+            return self._fetch_ids(query, dir_params)
+        except sqlite3.Error as e:
+            print(f"Database error resolving selected directories: {e}")
+            return set()
 
     def evaluate(self, node: ASTNode) -> Set[str]:
         """
-        Recursively evaluates the AST node and returns a set of matching image IDs.
+        Evaluates the AST and returns the set of matching image IDs.
 
         Args:
-            node: The current AST node to evaluate.
+            node: The root AST node of the query.
 
         Returns:
-            A set of image IDs matching the query represented by the node.
+            A set of image IDs matching the query, within the selected directories.
         """
-        result: Set[str] = set()
+        if self.use_sql:
+            return self.evaluate_sql(node)
+        return self._evaluate_in_python(node)
 
-        if isinstance(node, TagNode):
-            # get_image_ids_by_tag now filters by directory scope internally
-            result = self.get_image_ids_by_tag(node.tag)
+    def _evaluate_in_python(self, node: ASTNode) -> Set[str]:
+        """Runs evaluate_python with caches that only live for this evaluation."""
+        # Cached results are only reused within a single evaluation, so new images are picked up
+        self._clear_caches()
+        try:
+            return self.evaluate_python(node)
+        finally:
+            self._clear_caches()
 
-        elif isinstance(node, AllImagesNode):
-            # Returns all images within the selected directories scope
-            result = self.get_all_image_ids_in_scope()
+    def _clear_caches(self):
+        """Drops the memoized scope and tag results."""
+        self._scope_cache = None
+        self._tag_cache = {}
 
-        elif isinstance(node, AndNode):
-            left_set = self.evaluate(node.left)
-            # Optimization: If left set is empty, intersection will be empty
-            if not left_set:
-                result = set()
+    def evaluate_sql(self, node: ASTNode) -> Set[str]:
+        """
+        Evaluates the AST with a single SQL query, letting SQLite perform the
+        set operations (INTERSECT/UNION/EXCEPT) instead of materializing each
+        intermediate result in Python.
+        """
+        if not self._dir_ids:
+            return set()
+
+        try:
+            expr_sql, expr_params = self.evaluate_to_sql(node)
+            # The images in scope are defined once as the 'scope' CTE, which AllImagesNode
+            # and NOT refer to, so the directory IDs are bound a single time
+            query = (f"WITH scope(image_id) AS (SELECT id FROM images WHERE {self._DIR_WHERE}) "
+                     f"SELECT image_id FROM scope WHERE image_id IN ({expr_sql})")
+            final_params = self._dir_params + expr_params
+
+            return self._fetch_ids(query, final_params)
+        except sqlite3.OperationalError as e:
+            # The statement exceeds one of SQLite's limits (e.g. more than 500 terms in a
+            # compound SELECT, or brackets nested too deeply for its parser)
+            print(f"Database error evaluating query, falling back to Python evaluation: {e}")
+            return self._evaluate_in_python(node)
+        except sqlite3.Error as e:
+            print(f"Database error evaluating query: {e}")
+            return set()
+
+    def evaluate_to_sql(self, node: ASTNode) -> Tuple[str, List[str]]:
+        """
+        Recursively translates an AST node into a SQL SELECT returning a single
+        'image_id' column, together with its positional parameters.
+
+        Tag lookups are not scoped to the selected directories here; evaluate_sql
+        applies the directory scope once to the final result. The SQL refers to the
+        'scope' CTE defined by evaluate_sql.
+        """
+        handler = self._dispatch.get(type(node))
+        if handler is None:
+            raise ValueError(f"Unknown AST node type during evaluation: {type(node)}")
+        return handler(node)
+
+    def _eval_tag(self, node: TagNode) -> Tuple[str, List[str]]:
+        return ("SELECT it.image_id FROM image_tags it JOIN tags t ON it.tag_id = t.id "
+                "WHERE t.name = ?", [node.tag.lower()])
+
+    def _eval_all(self, node: AllImagesNode) -> Tuple[str, List]:
+        return "SELECT image_id FROM scope", []
+
+    def _eval_and(self, node: AndNode) -> Tuple[str, List]:
+        return self._and_sql(self._chain_operands(node))
+
+    def _eval_not(self, node: NotNode) -> Tuple[str, List]:
+        return self._and_sql([node])
+
+    def _eval_or(self, node: OrNode) -> Tuple[str, List]:
+        return self._compound_sql("UNION", self._chain_operands(node))
+
+    @staticmethod
+    def _chain_operands(node: ASTNode) -> List[ASTNode]:
+        """
+        Returns the operands of a chain of nodes of the same type as node, left to right
+        and looking through brackets (e.g. 'a AND [b AND c] AND d' gives a, b, c, d).
+        """
+        chain_type = type(node)
+        operands: List[ASTNode] = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            while type(current) is BracketNode:
+                current = current.expression
+            if type(current) is chain_type:
+                stack.append(current.right)
+                stack.append(current.left)
             else:
-                right_set = self.evaluate(node.right)
-                result = left_set.intersection(right_set)
+                operands.append(current)
+        return operands
+
+    def _compound_sql(self, operator: str, operands: List[ASTNode]) -> Tuple[str, List]:
+        # One flat 'a INTERSECT b INTERSECT c' per chain: nesting every pair in a subquery
+        # overflows SQLite's parser stack after a dozen or so terms
+        parts = []
+        params = []
+        for operand in operands:
+            operand_sql, operand_params = self.evaluate_to_sql(operand)
+            if type(operand) not in self._SIMPLE_SELECT_NODES:
+                # SQLite doesn't allow parenthesized compound operands, so wrap it in a subquery
+                operand_sql = f"SELECT image_id FROM ({operand_sql})"
+            parts.append(operand_sql)
+            params.extend(operand_params)
+        return f" {operator} ".join(parts), params
+
+    def _and_sql(self, operands: List[ASTNode]) -> Tuple[str, List]:
+        """
+        Translates the operands of an AND chain. The NOT operands are combined into a
+        single 'SELECT image_id FROM scope WHERE image_id NOT IN (...) AND ...': an
+        anti-join probing the excluded IDs (materialized once by SQLite) for each image
+        in scope, rather than an EXCEPT that builds and sorts both sides, and flat for
+        'NOT a AND NOT b AND ...'. The IDs are NOT NULL, so NOT IN is safe.
+        """
+        positives = [operand for operand in operands if type(operand) is not NotNode]
+        negatives = [operand.node for operand in operands if type(operand) is NotNode]
+        if not negatives:
+            return self._compound_sql("INTERSECT", positives)
+
+        conditions = []
+        params = []
+        for excluded in negatives:
+            excluded_sql, excluded_params = self.evaluate_to_sql(excluded)
+            conditions.append(f"image_id NOT IN ({excluded_sql})")
+            params.extend(excluded_params)
+        anti_join_sql = "SELECT image_id FROM scope WHERE " + " AND ".join(conditions)
+        if not positives:
+            return anti_join_sql, params
 
-        elif isinstance(node, OrNode):
-            left_set = self.evaluate(node.left)
-            right_set = self.evaluate(node.right)
-            result = left_set.union(right_set)
+        positives_sql, positives_params = self._compound_sql("INTERSECT", positives)
+        return f"{positives_sql} INTERSECT {anti_join_sql}", positives_params + params
 
-        elif isinstance(node, NotNode):
+    def _eval_bracket(self, node: BracketNode) -> Tuple[str, List]:
+        return self.evaluate_to_sql(node.expression)
+
+    def evaluate_python(self, node: ASTNode) -> Set[str]:
+        """
+        Evaluates the AST node in Python and returns a set of matching image IDs.
+
+        The tree is walked iteratively (no recursion depth limit for long 'a AND b AND ...'
+        chains). All tags are first fetched with a single query, then the sets are combined
+        in post-order using an explicit work stack and a stack of intermediate results.
+
+        Args:
+            node: The root AST node to evaluate.
+
+        Returns:
+            A set of image IDs matching the query represented by the node.
+        """
+        self.prefetch_tags(self._collect_tags(node))
+
+        # Work items are (node, stage); stage 0 means the node hasn't been visited yet
+        work: List[Tuple[ASTNode, int]] = [(node, 0)]
+        values: List[Set[str]] = []
+        steps = self._steps
+
+        while work:
+            current, stage = work.pop()
+            step = steps.get(type(current))
+            if step is None:
+                raise ValueError(f"Unknown AST node type during evaluation: {type(current)}")
+            step(current, stage, work, values)
+
+        return values.pop()
+
+    def _step_tag(self, node: TagNode, stage: int, work: list, values: list):
+        # get_image_ids_by_tag filters by directory scope and returns the prefetched set
+        values.append(self.get_image_ids_by_tag(node.tag))
+
+    def _step_all(self, node: AllImagesNode, stage: int, work: list, values: list):
+        # Returns all images within the selected directories scope
+        values.append(self.get_all_image_ids_in_scope())
+
+    def _step_and(self, node: AndNode, stage: int, work: list, values: list):
+        if stage == 0:
+            work.append((node, 1))
+            work.append((node.left, 0))
+        elif stage == 1:
+            # Optimization: If left set is empty, intersection will be empty (keep it as the result)
+            if values[-1]:
+                work.append((node, 2))
+                work.append((node.right, 0))
+        else:
+            right_set = values.pop()
+            values.append(values.pop().intersection(right_set))
+
+    def _step_or(self, node: OrNode, stage: int, work: list, values: list):
+        if stage == 0:
+            work.append((node, 1))
+            work.append((node.left, 0))
+        elif stage == 1:
+            # Optimization: If left set is the whole scope, the union can't add anything
+            if values[-1] is not self._scope_cache:
+                work.append((node, 2))
+                work.append((node.right, 0))
+        else:
+            right_set = values.pop()
+            values.append(values.pop().union(right_set))
+
+    def _step_not(self, node: NotNode, stage: int, work: list, values: list):
+        if stage == 0:
+            # Optimization: 'NOT tag' without a cached scope is a single anti-join query
+            # (such tags are left out of the prefetch, see _collect_tags)
+            inner = node.node
+            if (type(inner) is TagNode and self._scope_cache is None
+                    and inner.tag.lower() not in self._tag_cache):
+                values.append(self.get_image_ids_without_tag(inner.tag))
+            else:
+                work.append((node, 1))
+                work.append((inner, 0))
+        else:
+            excluded_set = values.pop()
             # Get all images within the current scope (selected directories)
             all_in_scope = self.get_all_image_ids_in_scope()
-            # Evaluate the node to be excluded
-            excluded_set = self.evaluate(node.node)
             # Result is all images in scope minus the excluded ones
-            result = all_in_scope - excluded_set
+            # (the scope itself if nothing is excluded, avoiding a copy)
+            values.append(all_in_scope - excluded_set if excluded_set else all_in_scope)
 
-        elif isinstance(node, BracketNode):
-            # Brackets primarily affect parsing order, evaluation just processes the inner expression
-            result = self.evaluate(node.expression)
+    def _step_bracket(self, node: BracketNode, stage: int, work: list, values: list):
+        # Brackets primarily affect parsing order, evaluation just processes the inner expression
+        work.append((node.expression, 0))
 
-        else:
-            raise ValueError(f"Unknown AST node type during evaluation: {type(node)}")
+    @staticmethod
+    def _collect_tags(node: ASTNode) -> Set[str]:
+        """
+        Returns the lowercase tags of the TagNodes in the AST, except those directly
+        under a NotNode, which are usually answered by an anti-join instead.
+        """
+        tags: Set[str] = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if isinstance(current, TagNode):
+                tags.add(current.tag.lower())
+            elif isinstance(current, (AndNode, OrNode)):
+                stack.append(current.left)
+                stack.append(current.right)
+            elif isinstance(current, NotNode):
+                if not isinstance(current.node, TagNode):
+                    stack.append(current.node)
+            elif isinstance(current, BracketNode):
+                stack.append(current.expression)
+        return tags
 
-        return result
+    def _fetch_ids(self, query: str, params: list) -> set:
+        """
+        Runs a single-column query on this thread's read connection and returns its values as a set.
+        The scalar row factory streams values straight into the set, without building
+        an intermediate list of one-tuples.
+        """
+        cursor = self.db.get_read_conn().cursor()
+        cursor.row_factory = _first_column
+        return set(cursor.execute(query, params))
 
     def get_image_ids_by_tag(self, tag: str) -> Set[str]:
         """
         Retrieves image IDs associated with a specific tag from the database,
         filtered by the currently selected directories.
+        Results are memoized by lowercase tag; the returned set must not be modified.
         """
-        # If no directories are selected, no images can match the scope.
-        if not self.selected_directories:
+        # If no directories are in scope, no images can match.
+        if not self._dir_ids:
             return set()
 
+        # Tags are matched case-insensitively, e.g. 'cat OR [Cat AND dog]' queries 'cat' once
+        tag_name = tag.lower()
+        cached = self._tag_cache.get(tag_name)
+        if cached is not None:
+            return cached
+
+        query = self._TAG_SQL
+        final_params = [tag_name] + self._dir_params
+
         try:
-            with self.db.lock: # Use the database's lock
-                with sqlite3.connect(self.db.db_path) as conn:
-                    conn.execute("PRAGMA query_only = ON")
-                    cursor = conn.cursor()
-
-                    # Build directory conditions
-                    dir_conditions = []
-                    dir_params = []
-                    for norm_dir in self.selected_directories:
-                         if not norm_dir.endswith('/'): norm_dir += '/'
-                         dir_conditions.append("i.path LIKE ?")
-                         dir_params.append(f"{norm_dir}%")
-                    dir_where_clause = " OR ".join(dir_conditions)
-
-                    # Combine tag and directory conditions
-                    # Case-insensitive tag search: lower(t.name) = lower(?)
-                    query = f"""
-                        SELECT it.image_id
-                        FROM image_tags it
-                        JOIN tags t ON it.tag_id = t.id
-                        JOIN images i ON it.image_id = i.id
-                        WHERE lower(t.name) = lower(?) AND ({dir_where_clause})
-                    """
-                    final_params = [tag] + dir_params
-
-                    cursor.execute(query, final_params)
-                    result = {row[0] for row in cursor.fetchall()}
+            result = self._fetch_ids(query, final_params)
+            self._tag_cache[tag_name] = result
             return result
         except sqlite3.Error as e:
             print(f"Database error getting images by tag '{tag}' within scope: {e}")
             return set()
 
+    def prefetch_tags(self, tags: Set[str]):
+        """
+        Fetches the image IDs of several lowercase tags within the selected directories
+        with a single query and memoizes them, so that get_image_ids_by_tag doesn't
+        need a query per tag.
+        """
+        tag_names = [tag for tag in tags if tag not in self._tag_cache]
+        if not self._dir_ids or not tag_names:
+            return
+
+        query = self._TAGS_SQL
+        final_params = [json.dumps(tag_names)] + self._dir_params
+        # Tags without any image in scope are memoized as empty sets too
+        results: Dict[str, Set[str]] = {tag: set() for tag in tag_names}
+
+        try:
+            cursor = self.db.get_read_conn().cursor()
+            for tag_name, image_id in cursor.execute(query, final_params):
+                results[tag_name].add(image_id)
+        except sqlite3.Error as e:
+            # get_image_ids_by_tag falls back to one query per tag
+            print(f"Database error prefetching tags within scope: {e}")
+            return
+
+        self._tag_cache.update(results)
+
+    def get_image_ids_without_tag(self, tag: str) -> Set[str]:
+        """Retrieves image IDs within the selected directories that do NOT have the given tag."""
+        if not self._dir_ids:
+            return set()
+
+        query = self._WITHOUT_TAG_SQL
+        final_params = self._dir_params + [tag.lower()]
+
+        try:
+            return self._fetch_ids(query, final_params)
+        except sqlite3.Error as e:
+            print(f"Database error getting images without tag '{tag}' within scope: {e}")
+            return set()
+
     def get_all_image_ids_in_scope(self) -> Set[str]:
-        """Retrieves all image IDs within the currently selected directories."""
-        if not self.selected_directories:
+        """
+        Retrieves all image IDs within the currently selected directories.
+        The result is memoized (e.g. for 'NOT a AND NOT b'); the returned set must not be modified.
+        """
+        if not self._dir_ids:
             return set()
+        if self._scope_cache is not None:
+            return self._scope_cache
+
+        query = self._SCOPE_SQL
 
         try:
-            with self.db.lock:
-                with sqlite3.connect(self.db.db_path) as conn:
-                    conn.execute("PRAGMA query_only = ON")
-                    cursor = conn.cursor()
-                    # Build WHERE clause for directories
-                    dir_conditions = []
-                    params = []
-                    for norm_dir in self.selected_directories:
-                         if not norm_dir.endswith('/'): norm_dir += '/'
-                         dir_conditions.append("path LIKE ?")
-                         params.append(f"{norm_dir}%")
-
-                    where_clause = " OR ".join(dir_conditions)
-                    query = f"SELECT id FROM images WHERE {where_clause}"
-
-                    cursor.execute(query, params)
-                    result = {row[0] for row in cursor.fetchall()}
+            result = self._fetch_ids(query, self._dir_params)
+            self._scope_cache = result
             return result
         except sqlite3.Error as e:
             print(f"Database error getting all image IDs in scope: {e}")
@@ -157,29 +496,12 @@ class SearchQueryEvaluator:
          if not self.selected_directories or not image_ids:
              return image_ids # No filtering needed or possible
 
+         # Query images matching the IDs (bound as one JSON array) AND the directory scope
+         query = self._FILTER_SQL
+         final_params = [json.dumps(list(image_ids))] + self._dir_params
+
          try:
-             with self.db.lock:
-                 with sqlite3.connect(self.db.db_path) as conn:
-                     conn.execute("PRAGMA query_only = ON")
-                     cursor = conn.cursor()
-
-                     # Build WHERE clause for directories
-                     dir_conditions = []
-                     params = []
-                     for norm_dir in self.selected_directories:
-                          if not norm_dir.endswith('/'): norm_dir += '/'
-                          dir_conditions.append("path LIKE ?")
-                          params.append(f"{norm_dir}%")
-                     dir_where_clause = " OR ".join(dir_conditions)
-
-                     # Query images matching the IDs AND the directory scope
-                     id_placeholders = ','.join('?' for _ in image_ids)
-                     query = f"SELECT id FROM images WHERE id IN ({id_placeholders}) AND ({dir_where_clause})"
-                     final_params = list(image_ids) + params
-
-                     cursor.execute(query, final_params)
-                     filtered_ids = {row[0] for row in cursor.fetchall()}
-             return filtered_ids
+             return self._fetch_ids(query, final_params)
          except sqlite3.Error as e:
              print(f"Database error filtering by directory scope: {e}")
              return set() # Return empty set on error
\ No newline at end of file
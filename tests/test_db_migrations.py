@@ -0,0 +1,111 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from database.db_manager import Database
+
+# Schema of databases created before directories and lowercase tags existed
+BASELINE_SCHEMA = """
+    CREATE TABLE tags (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE NOT NULL,
+        category TEXT
+    );
+    CREATE TABLE images (
+        id TEXT PRIMARY KEY,
+        path TEXT UNIQUE NOT NULL,
+        rating TEXT,
+        file_size INTEGER,
+        modification_time REAL,
+        resolution TEXT
+    );
+    CREATE TABLE image_tags (
+        image_id TEXT NOT NULL,
+        tag_id INTEGER NOT NULL,
+        confidence REAL,
+        FOREIGN KEY (image_id) REFERENCES images(id) ON DELETE CASCADE,
+        FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE,
+        PRIMARY KEY (image_id, tag_id)
+    );
+    CREATE INDEX idx_images_path ON images(path);
+"""
+
+IMAGES = {
+    'img1': '/photos/a/one.jpg',
+    'img2': '/photos/a/b/two.jpg',
+    'img3': '/photos/a/b/c/three.jpg',
+    'img4': '/photos/a/four.jpg',
+}
+
+# Tags differing only by case, including a non-ASCII one that SQLite's lower() wouldn't fold
+TAGS = [(1, 'Cat'), (2, 'cat'), (3, 'DOG'), (4, 'ÉTÉ'), (5, 'sky'), (6, 'été')]
+IMAGE_TAGS = [
+    ('img1', 1, 0.9), ('img1', 2, 0.8), # Both spellings on one image: the duplicate is dropped
+    ('img2', 2, 0.7),                   # Moved to the kept 'cat'
+    ('img3', 3, 0.6),
+    ('img2', 5, 0.5),
+    ('img4', 6, 0.4),                   # Moved to the kept 'été'
+]
+
+
+class DatabaseMigrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self._tmp_dir.name) / 'db.sqlite'
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript(BASELINE_SCHEMA)
+            conn.executemany("INSERT INTO images (id, path) VALUES (?, ?)", IMAGES.items())
+            conn.executemany("INSERT INTO tags (id, name) VALUES (?, ?)", TAGS)
+            conn.executemany("INSERT INTO image_tags (image_id, tag_id, confidence) VALUES (?, ?, ?)", IMAGE_TAGS)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def open_database(self) -> Database:
+        db = Database(self.db_path, thumbnail_cache=None)
+        self.addCleanup(db.close)
+        return db
+
+    def rows(self, query: str) -> set:
+        with sqlite3.connect(self.db_path) as conn:
+            return set(conn.execute(query).fetchall())
+
+    def snapshot(self) -> dict:
+        return {table: self.rows(f"SELECT * FROM {table}")
+                for table in ('tags', 'image_tags', 'directories', 'images')}
+
+    def test_image_directories(self):
+        self.open_database()
+
+        self.assertEqual({path for (path,) in self.rows("SELECT path FROM directories")},
+                         {'/photos/a/', '/photos/a/b/', '/photos/a/b/c/'})
+        self.assertEqual(self.rows("SELECT i.id, d.path FROM images i JOIN directories d ON i.dir_id = d.id"),
+                         {('img1', '/photos/a/'), ('img2', '/photos/a/b/'),
+                          ('img3', '/photos/a/b/c/'), ('img4', '/photos/a/')})
+        self.assertEqual(self.rows("SELECT name FROM sqlite_master WHERE name = 'idx_images_path'"), set())
+
+        # A second startup doesn't change anything
+        migrated = self.snapshot()
+        self.open_database()
+        self.assertEqual(self.snapshot(), migrated)
+
+    def test_lowercase_tags(self):
+        self.open_database()
+
+        self.assertEqual(self.rows("SELECT id, name FROM tags"),
+                         {(1, 'cat'), (3, 'dog'), (4, 'été'), (5, 'sky')})
+        self.assertEqual(self.rows("SELECT image_id, tag_id, confidence FROM image_tags"),
+                         {('img1', 1, 0.9), ('img2', 1, 0.7), ('img3', 3, 0.6),
+                          ('img2', 5, 0.5), ('img4', 4, 0.4)})
+        self.assertEqual(self.rows("PRAGMA user_version"), {(1,)})
+
+        # A second startup doesn't change anything
+        migrated = self.snapshot()
+        self.open_database()
+        self.assertEqual(self.snapshot(), migrated)
+
+
+if __name__ == '__main__':
+    unittest.main()
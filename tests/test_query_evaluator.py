@@ -0,0 +1,113 @@
+import sqlite3
+import threading
+import unittest
+
+from search.query_evaluator import SearchQueryEvaluator
+from search.query_parser import SearchQueryParser
+
+# Directories and the tags of the images directly inside them
+IMAGES = {
+    '/a/': [['cat'], ['cat', 'dog'], ['dog'], [], ['cat', 'sky']],
+    '/a/sub/': [['cat', 'dog', 'sky'], ['sky'], ['dog']],
+    '/b/': [['cat'], ['dog', 'sky']],
+}
+
+
+class _InMemoryDatabase:
+    """
+    The part of Database used by SearchQueryEvaluator, backed by a writable in-memory
+    database (not the mode=ro connection that Database.get_read_conn returns).
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE tags (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, category TEXT);
+            CREATE TABLE directories (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL);
+            CREATE TABLE images (id TEXT PRIMARY KEY, path TEXT UNIQUE NOT NULL, dir_id INTEGER);
+            CREATE TABLE image_tags (image_id TEXT NOT NULL, tag_id INTEGER NOT NULL,
+                                     confidence REAL, PRIMARY KEY (image_id, tag_id));
+        """)
+
+    def get_read_conn(self) -> sqlite3.Connection:
+        return self._conn
+
+
+class SearchQueryEvaluatorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = _InMemoryDatabase()
+        cls.tags_by_image = {}
+        cls.dir_by_image = {}
+        conn = cls.db.get_read_conn()
+        for directory, images in IMAGES.items():
+            dir_id = conn.execute("INSERT INTO directories (path) VALUES (?)", (directory,)).lastrowid
+            for index, tags in enumerate(images):
+                image_id = f"{directory}img{index}"
+                conn.execute("INSERT INTO images (id, path, dir_id) VALUES (?, ?, ?)",
+                             (image_id, f"{image_id}.png", dir_id))
+                for tag in tags:
+                    conn.execute("INSERT OR IGNORE INTO tags (name) VALUES (?)", (tag,))
+                    conn.execute("INSERT INTO image_tags (image_id, tag_id) SELECT ?, id FROM tags WHERE name = ?",
+                                 (image_id, tag))
+                cls.tags_by_image[image_id] = set(tags)
+                cls.dir_by_image[image_id] = directory
+        conn.commit()
+
+    def evaluate(self, query, directories=frozenset({'/a'}), use_sql=True):
+        ast = SearchQueryParser().parse(query)
+        return SearchQueryEvaluator(self.db, directories, use_sql=use_sql).evaluate(ast)
+
+    def in_scope(self, predicate, directory='/a/'):
+        return {image_id for image_id, tags in self.tags_by_image.items()
+                if self.dir_by_image[image_id].startswith(directory) and predicate(tags)}
+
+    def assert_query(self, query, expected):
+        self.assertEqual(self.evaluate(query), expected)
+        self.assertEqual(self.evaluate(query, use_sql=False), expected)
+
+    def test_simple_queries(self):
+        self.assert_query('', self.in_scope(lambda tags: True))
+        self.assert_query('cat', self.in_scope(lambda tags: 'cat' in tags))
+        self.assert_query('CAT AND dog', self.in_scope(lambda tags: {'cat', 'dog'} <= tags))
+        self.assert_query('cat OR sky', self.in_scope(lambda tags: 'cat' in tags or 'sky' in tags))
+        self.assert_query('NOT [cat OR dog]', self.in_scope(lambda tags: not tags & {'cat', 'dog'}))
+
+    def test_not_queries(self):
+        self.assert_query('NOT NOT cat', self.in_scope(lambda tags: 'cat' in tags))
+        self.assert_query('NOT cat AND NOT dog', self.in_scope(lambda tags: not tags & {'cat', 'dog'}))
+        self.assert_query('cat AND NOT [dog OR NOT sky]',
+                          self.in_scope(lambda tags: 'cat' in tags and 'dog' not in tags and 'sky' in tags))
+        self.assert_query('[cat OR dog] AND NOT sky',
+                          self.in_scope(lambda tags: tags & {'cat', 'dog'} and 'sky' not in tags))
+
+    def test_long_and_chain(self):
+        self.assert_query(' AND '.join(['cat'] * 40), self.in_scope(lambda tags: 'cat' in tags))
+
+    def test_long_not_chain(self):
+        self.assert_query(' AND '.join(['NOT dog'] * 40), self.in_scope(lambda tags: 'dog' not in tags))
+
+    def test_long_or_chain(self):
+        self.assert_query(' OR '.join(['cat', 'sky'] * 20), self.in_scope(lambda tags: tags & {'cat', 'sky'}))
+
+    def test_long_mixed_chain(self):
+        query = ' AND '.join(['[cat OR NOT dog]'] * 30)
+        self.assert_query(query, self.in_scope(lambda tags: 'cat' in tags or 'dog' not in tags))
+
+    def test_chain_over_compound_select_limit(self):
+        # More terms than SQLite allows in one compound SELECT: falls back to Python evaluation
+        self.assert_query(' AND '.join(['cat'] * 600), self.in_scope(lambda tags: 'cat' in tags))
+
+    def test_directory_scope(self):
+        self.assertEqual(self.evaluate('cat', frozenset({'/a/sub'})),
+                         self.in_scope(lambda tags: 'cat' in tags, '/a/sub/'))
+        self.assertEqual(self.evaluate('cat', frozenset({'/a/sub', '/b'})),
+                         self.in_scope(lambda tags: 'cat' in tags, '/a/sub/')
+                         | self.in_scope(lambda tags: 'cat' in tags, '/b/'))
+        self.assertEqual(self.evaluate('cat', frozenset()), set())
+
+
+if __name__ == '__main__':
+    unittest.main()